@@ -0,0 +1,12 @@
+#!/bin/bash
+# Build the fused preprocessing kernel (src/fused_preproc.c) as a shared
+# library next to its source. test_optimizations.py picks it up via
+# ctypes; without it the script silently uses cv2.threshold.
+
+set -e
+cd "$(dirname "$0")/.."
+
+cc -O3 -fopenmp -shared -fPIC \
+    src/fused_preproc.c -o src/libfused_preproc.so
+
+echo "Built src/libfused_preproc.so"
@@ -0,0 +1,73 @@
+/* Fused Otsu threshold for the ArUco preprocessing chain.
+ *
+ * cv2.threshold(..., THRESH_OTSU) walks the CLAHE-corrected image once
+ * to build the histogram and again to binarize, each as a separate
+ * OpenCV call with its own output allocation. This kernel does the same
+ * work in one tight pair of loops over a caller-provided buffer: a
+ * histogram pass, the Otsu between-class-variance scan over 256 bins,
+ * and a SIMD binarize pass (perfectly nested row loop, inner loop
+ * vectorized with omp simd).
+ *
+ * Build with scripts/build_fused_preproc.sh; the Python side loads the
+ * resulting libfused_preproc.so via ctypes and falls back to
+ * cv2.threshold when it is absent.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+#if defined(__GNUC__) && defined(__x86_64__)
+#define FUSED_CLONES __attribute__((target_clones("avx2", "default")))
+#else
+#define FUSED_CLONES
+#endif
+
+/* Binarize `in` (width x height, 8-bit, contiguous) into `out` with the
+ * Otsu-optimal global threshold. Returns the threshold used. */
+FUSED_CLONES
+int aruco_otsu_threshold(const uint8_t *in, uint8_t *out,
+                         int width, int height)
+{
+    uint32_t hist[256] = {0};
+    const size_t n = (size_t)width * (size_t)height;
+
+    for (int y = 0; y < height; ++y) {
+        const uint8_t *row = in + (size_t)y * width;
+        for (int x = 0; x < width; ++x)
+            hist[row[x]]++;
+    }
+
+    /* Otsu: maximize between-class variance over the 256 bins. */
+    double sum = 0.0;
+    for (int i = 0; i < 256; ++i)
+        sum += (double)i * hist[i];
+
+    double sum_b = 0.0, w_b = 0.0, best_var = -1.0;
+    int thresh = 0;
+    for (int i = 0; i < 256; ++i) {
+        w_b += hist[i];
+        if (w_b == 0.0)
+            continue;
+        double w_f = (double)n - w_b;
+        if (w_f == 0.0)
+            break;
+        sum_b += (double)i * hist[i];
+        double m_b = sum_b / w_b;
+        double m_f = (sum - sum_b) / w_f;
+        double var = w_b * w_f * (m_b - m_f) * (m_b - m_f);
+        if (var > best_var) {
+            best_var = var;
+            thresh = i;
+        }
+    }
+
+    for (int y = 0; y < height; ++y) {
+        const uint8_t *src = in + (size_t)y * width;
+        uint8_t *dst = out + (size_t)y * width;
+#pragma omp simd
+        for (int x = 0; x < width; ++x)
+            dst[x] = (uint8_t)(src[x] > thresh ? 255 : 0);
+    }
+
+    return thresh;
+}